@@ -1,13 +1,17 @@
 import os
+import glob
 import shutil
 import uuid
 import sys
 import tempfile
-from fastapi import FastAPI, UploadFile, File, Form, BackgroundTasks
+import zipfile
+from typing import List
+from fastapi import FastAPI, UploadFile, File, Form, Query, BackgroundTasks
 from fastapi.staticfiles import StaticFiles
 from fastapi.responses import FileResponse, StreamingResponse
 import json
 import fw_srt
+import transcript_index
 import logging
 
 # Setup logging
@@ -23,6 +27,12 @@ logging.info(f"FFmpeg path: {shutil.which('ffmpeg')}")
 
 app = FastAPI()
 
+# Word-level search index shared by batch transcriptions and /search
+INDEX_PATH = os.environ.get("CAPTIONARY_INDEX", transcript_index.DEFAULT_INDEX)
+
+# Upper bound for concurrent files in one batch request (each worker holds a model replica)
+MAX_BATCH_WORKERS = 16
+
 def resource_path(relative_path):
     """ Get absolute path to resource, works for dev and for PyInstaller """
     if hasattr(sys, '_MEIPASS'):
@@ -54,7 +64,8 @@ async def download_file(filename: str, background_tasks: BackgroundTasks, downlo
         # Schedule file deletion after the response is sent
         background_tasks.add_task(os.remove, file_path)
         
-        return FileResponse(file_path, filename=display_name, media_type="application/x-subrip")
+        media_type = "application/zip" if filename.endswith(".zip") else "application/x-subrip"
+        return FileResponse(file_path, filename=display_name, media_type=media_type)
     return {"error": "File not found"}
 
 
@@ -143,3 +154,110 @@ async def transcribe(
                 os.remove(temp_filename)
 
     return StreamingResponse(event_generator(), media_type="application/x-ndjson")
+
+
+def collect_batch_paths(file_paths, directory, pattern):
+    """ Expand a batch manifest (explicit paths and/or a directory plus glob) into a list of files """
+    paths = list(file_paths or [])
+    if directory and os.path.isdir(directory):
+        if pattern:
+            matches = glob.glob(os.path.join(glob.escape(directory), pattern), recursive=True)
+            paths.extend(sorted(p for p in matches if os.path.isfile(p)))
+        else:
+            paths.extend(fw_srt.find_media_files([directory]))
+    return paths
+
+
+def batch_archive_names(paths, directory):
+    """ Pick a unique .srt name inside the result archive for every input path """
+    names = []
+    seen = set()
+    for index, path in enumerate(paths):
+        if directory and os.path.abspath(path).startswith(os.path.abspath(directory) + os.sep):
+            name = os.path.relpath(path, directory)
+        else:
+            name = os.path.basename(path)
+        stem = os.path.splitext(name)[0]
+        name = stem + ".srt"
+        suffix = index
+        while name in seen:
+            name = f"{stem}_{suffix}.srt"
+            suffix += 1
+        seen.add(name)
+        names.append(name.replace(os.sep, "/"))
+    return names
+
+
+@app.post("/transcribe/batch")
+async def transcribe_batch(
+    file_paths: List[str] = Form(None),
+    directory: str = Form(None),
+    pattern: str = Form(None),
+    model: str = Form("large-v3-turbo"),
+    lang: str = Form(None),
+    offset: str = Form(""),
+    device: str = Form("cpu"),
+    compute_type: str = Form("int8"),
+    workers: int = Form(1, ge=1, le=MAX_BATCH_WORKERS),
+    index: bool = Form(False),
+    processes: bool = Form(False)
+):
+    # Server-local paths only: files are read in place, nothing is uploaded or copied
+    paths = collect_batch_paths(file_paths, directory, pattern)
+    if not paths:
+        return {"type": "error", "message": "No files provided."}
+
+    logging.info(f"Received batch transcription request for {len(paths)} file(s). Model={model}, workers={workers}")
+    names = batch_archive_names(paths, directory)
+
+    def event_generator():
+        out_dir = tempfile.mkdtemp()
+        zip_filename = f"{uuid.uuid4()}.zip"
+        zip_path = os.path.join(tempfile.gettempdir(), zip_filename)
+        linked = False
+        try:
+            yield json.dumps({"type": "batch", "files": [{"path": p, "name": n} for p, n in zip(paths, names)]}) + "\n"
+
+            # Each SRT goes into the archive as soon as it finishes, so the zip is ready when the last file is
+            with zipfile.ZipFile(zip_path, "w", zipfile.ZIP_DEFLATED) as archive:
+                generator = fw_srt.transcribe_batch(
+                    paths,
+                    model_size=model,
+                    lang=lang if lang else None,
+                    offset_str=offset,
+                    device=device,
+                    compute_type=compute_type,
+                    workers=workers,
+                    out_dir=out_dir,
+                    index_path=INDEX_PATH if index else None,
+                    processes=processes
+                )
+                for item in generator:
+                    if item["type"] == "complete":
+                        archive.write(item["path"], names[item["file"]])
+                        os.remove(item["path"])
+                        yield json.dumps({"type": "file_complete", "file": item["file"], "name": names[item["file"]]}) + "\n"
+                    else:
+                        yield json.dumps(item) + "\n"
+
+            yield json.dumps({"type": "complete", "url": f"/download/{zip_filename}?download_name=captions.zip"}) + "\n"
+            linked = True  # from here on /download owns (and removes) the archive
+
+        except Exception as e:
+            logging.error(f"Batch transcription error: {e}", exc_info=True)
+            yield json.dumps({"type": "error", "message": str(e)}) + "\n"
+        finally:
+            shutil.rmtree(out_dir, ignore_errors=True)
+            # Failed or abandoned streams never hand out the archive, so don't leave it behind
+            if not linked and os.path.exists(zip_path):
+                os.remove(zip_path)
+
+    return StreamingResponse(event_generator(), media_type="application/x-ndjson")
+
+
+@app.get("/search")
+async def search(q: str, limit: int = Query(20, ge=1, le=1000)):
+    results = transcript_index.search(INDEX_PATH, q, limit)
+    for hit in results:
+        hit["timestamp"] = fw_srt.ts(hit["start"])
+    return {"results": results}
@@ -1,9 +1,15 @@
-import argparse, math, os
+import argparse, math, os, queue, sys, time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from itertools import repeat
 from faster_whisper import WhisperModel
+import shared_model
+import transcript_index
+
+MEDIA_EXTS = ('.mp3', '.wav', '.m4a', '.mp4', '.mkv', '.mov', '.avi', '.flac', '.ogg', '.webm')
 
 def ts(t):
-    ms = int(round((t - int(t)) * 1000))
-    t = int(t)
+    # Round once on the whole value so e.g. 1.9996 becomes 00:00:02,000 rather than 00:00:01,1000
+    t, ms = divmod(int(round(t * 1000)), 1000)
     h = t // 3600
     m = (t % 3600) // 60
     s = t % 60
@@ -12,6 +18,8 @@ def ts(t):
 def parse_offset(s):
     if not s:
         return 0.0
+    if s.startswith("-"):
+        return -parse_offset(s[1:])
     parts = [float(p) for p in s.split(":")]
     if len(parts) == 3:
         h, m, sec = parts
@@ -21,9 +29,169 @@ def parse_offset(s):
         return m * 60 + sec
     return float(s)
 
-def transcribe_file(audio_path, model_size="medium", lang=None, offset_str="", device="cpu", compute_type="int8"):
-    yield {"type": "status", "message": "Loading model..."}
-    model = WhisperModel(model_size, device=device, compute_type=compute_type)
+def parse_ts(s):
+    # Inverse of ts(); also accepts "." as the millisecond separator and a missing hours field (MM:SS,mmm)
+    parts = s.strip().split(":")
+    h, m, rest = parts if len(parts) == 3 else ["0"] + parts
+    sec, _, ms = rest.replace(".", ",").partition(",")
+    return int(h) * 3600 + int(m) * 60 + int(sec) + int(ms.ljust(3, "0")[:3]) / 1000
+
+def read_srt(f, skipped=None):
+    """Stream (start, end, text) cues from an open SRT file, one cue in memory at a time.
+
+    Cues that cannot be parsed are left out; pass a list as `skipped` to collect their first line.
+    """
+    lines = []
+    for line in f:
+        line = line.rstrip("\r\n")
+        if line.strip():
+            lines.append(line)
+            continue
+        if lines:
+            cue = _parse_cue(lines)
+            if cue:
+                yield cue
+            elif skipped is not None:
+                skipped.append(lines[0])
+            lines = []
+    if lines:
+        cue = _parse_cue(lines)
+        if cue:
+            yield cue
+        elif skipped is not None:
+            skipped.append(lines[0])
+
+def _parse_cue(lines):
+    # The index line is optional in the wild; the timing line is whichever comes first with an arrow
+    i = 0 if "-->" in lines[0] else 1
+    if i >= len(lines) or "-->" not in lines[i]:
+        return None
+    start, end = lines[i].split("-->", 1)
+    try:
+        # split() drops any position settings after the end time
+        return parse_ts(start), parse_ts(end.split()[0]), "\n".join(lines[i + 1:])
+    except (ValueError, IndexError):
+        return None  # malformed: read_srt leaves it out and reports it
+
+def write_srt(f, cues):
+    n = 0
+    for n, (start, end, text) in enumerate(cues, 1):
+        f.write(f"{n}\n{ts(start)} --> {ts(end)}\n{text}\n\n")
+    return n
+
+def shift_cues(cues, off):
+    for start, end, text in cues:
+        start += off
+        end += off
+        if end <= 0:
+            continue  # shifted entirely before 00:00:00
+        yield max(start, 0.0), end, text
+
+def merge_short_cues(cues, min_duration, max_gap, max_duration=0):
+    # Grow a cue shorter than min_duration with the following cues (at most max_gap apart) until it
+    # is long enough, and merge a short cue into the one before it. Either way the merged cue must
+    # stay within max_duration (or twice min_duration when no maximum is set), so merging never
+    # creates a cue that split_long_cues would have to cut again.
+    limit = max_duration or 2 * min_duration
+    pending = None
+    for cue in cues:
+        if pending is None:
+            pending = cue
+            continue
+        end = max(pending[1], cue[1])  # overlapping cues: the later one may end first
+        close = cue[0] - pending[1] <= max_gap and end - pending[0] <= limit
+        short = pending[1] - pending[0] < min_duration or cue[1] - cue[0] < min_duration
+        if close and short:
+            pending = (pending[0], end, f"{pending[2]} {cue[2]}")
+        else:
+            yield pending
+            pending = cue
+    if pending is not None:
+        yield pending
+
+def split_long_cues(cues, max_duration=0, max_chars=0):
+    # Split on word boundaries into balanced parts, sharing the cue's time proportionally to text length
+    for start, end, text in cues:
+        parts = 1
+        if max_duration:
+            parts = max(parts, math.ceil((end - start) / max_duration))
+        if max_chars:
+            parts = max(parts, math.ceil(len(text) / max_chars))
+        words = text.split()
+        if parts <= 1 or len(words) < 2:
+            yield start, end, text
+            continue
+
+        parts = min(parts, len(words))
+        target = len(text) / parts
+        chunks, current, size = [], [], 0
+        for word in words:
+            if current and size >= target * (len(chunks) + 1) and len(chunks) < parts - 1:
+                chunks.append(" ".join(current))
+                current = []
+            current.append(word)
+            size += len(word) + 1
+        chunks.append(" ".join(current))
+
+        total = sum(len(c) for c in chunks)
+        t = start
+        for chunk in chunks:
+            chunk_end = t + (end - start) * len(chunk) / total
+            yield t, chunk_end, chunk
+            t = chunk_end
+
+def retime_file(src, dst, off=0.0, min_duration=0, max_gap=0.5, max_duration=0, max_chars=0):
+    """Shift/merge/split one SRT file into dst.
+
+    Returns (src, cue count, skipped cue count, error message or None). Unparseable cues are
+    dropped from a copy in another location, but an in-place rewrite that would lose them is refused.
+    """
+    tmp = dst + ".tmp"
+    skipped = []
+    try:
+        if os.path.dirname(dst):
+            os.makedirs(os.path.dirname(dst), exist_ok=True)
+        with open(src, "r", encoding="utf-8-sig") as fin, open(tmp, "w", encoding="utf-8") as fout:
+            cues = read_srt(fin, skipped)
+            if off:
+                cues = shift_cues(cues, off)
+            if min_duration:
+                cues = merge_short_cues(cues, min_duration, max_gap, max_duration)
+            if max_duration or max_chars:
+                cues = split_long_cues(cues, max_duration, max_chars)
+            count = write_srt(fout, cues)
+        if skipped and os.path.abspath(src) == os.path.abspath(dst):
+            os.remove(tmp)
+            return src, 0, len(skipped), f"{len(skipped)} cue(s) could not be parsed (first: {skipped[0]!r}); file left unchanged"
+        os.replace(tmp, dst)  # also makes in-place rewrites safe against interruption
+        return src, count, len(skipped), None
+    except Exception as e:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        return src, 0, len(skipped), str(e)
+
+def find_media_files(paths):
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, names in os.walk(path):
+                for name in sorted(names):
+                    if name.lower().endswith(MEDIA_EXTS):
+                        files.append(os.path.join(root, name))
+        else:
+            files.append(path)
+    return files
+
+def load_model(model_size="medium", device="cpu", compute_type="int8", num_workers=1, cpu_threads=0):
+    # num_workers lets several threads transcribe concurrently with a single copy of the weights
+    return WhisperModel(model_size, device=device, compute_type=compute_type, num_workers=num_workers,
+                        cpu_threads=cpu_threads)
+
+def transcribe_file(audio_path, model_size="medium", lang=None, offset_str="", device="cpu", compute_type="int8",
+                    model=None, out_path=None, index_path=None):
+    if model is None:
+        yield {"type": "status", "message": "Loading model..."}
+        model = load_model(model_size, device, compute_type)
     
     yield {"type": "status", "message": "Starting transcription..."}
     segments, info = model.transcribe(
@@ -35,12 +203,26 @@ def transcribe_file(audio_path, model_size="medium", lang=None, offset_str="", d
     )
 
     off = parse_offset(offset_str)
-    out_path = audio_path.rsplit(".", 1)[0] + ".srt"
+    if out_path is None:
+        out_path = audio_path.rsplit(".", 1)[0] + ".srt"
     
     total_duration = info.duration
+    cues = [] if index_path else None  # (start, end, text, words) kept only when indexing
     
     with open(out_path, "w", encoding="utf-8") as f:
         srt_index = 1
+
+        def write_cue(start, end, text, words=()):
+            # Apply the offset; like shift_cues, clamp at 00:00:00 and drop cues that end before it
+            nonlocal srt_index
+            start, end = max(start + off, 0.0), end + off
+            if end <= 0:
+                return
+            f.write(f"{srt_index}\n{ts(start)} --> {ts(end)}\n{text}\n\n")
+            srt_index += 1
+            if cues is not None:
+                cues.append((start, end, text, [(w.word.strip(), max(w.start + off, 0.0), max(w.end + off, 0.0)) for w in words]))
+
         for seg in segments:
             # Yield progress
             if total_duration > 0:
@@ -53,10 +235,7 @@ def transcribe_file(audio_path, model_size="medium", lang=None, offset_str="", d
             if not words:
                 text = (seg.text or "").strip()
                 if not text: continue
-                start = seg.start + off
-                end = seg.end + off
-                f.write(f"{srt_index}\n{ts(start)} --> {ts(end)}\n{text}\n\n")
-                srt_index += 1
+                write_cue(seg.start, seg.end, text)
                 continue
 
             # Split on silence logic with orphan fix
@@ -81,29 +260,177 @@ def transcribe_file(audio_path, model_size="medium", lang=None, offset_str="", d
                     buffer_words.append(word)
                 elif gap > 1.0:
                     # Flush buffer
-                    start = buffer_words[0].start + off
-                    end = buffer_words[-1].end + off
                     text = "".join([w.word for w in buffer_words]).strip()
                     if text:
-                        f.write(f"{srt_index}\n{ts(start)} --> {ts(end)}\n{text}\n\n")
-                        srt_index += 1
+                        write_cue(buffer_words[0].start, buffer_words[-1].end, text, buffer_words)
                     buffer_words = [word]
                 else:
                     buffer_words.append(word)
             
             # Flush remaining words in buffer
             if buffer_words:
-                start = buffer_words[0].start + off
-                end = buffer_words[-1].end + off
                 text = "".join([w.word for w in buffer_words]).strip()
                 if text:
-                    f.write(f"{srt_index}\n{ts(start)} --> {ts(end)}\n{text}\n\n")
-                    srt_index += 1
+                    write_cue(buffer_words[0].start, buffer_words[-1].end, text, buffer_words)
     
+    if cues is not None:
+        yield {"type": "status", "message": "Updating search index..."}
+        transcript_index.add_file(index_path, os.path.abspath(audio_path), cues)
     
     yield {"type": "complete", "path": out_path}
 
-def main():
+def transcribe_batch(paths, model_size="medium", lang=None, offset_str="", device="cpu", compute_type="int8",
+                     workers=1, out_dir=None, index_path=None, processes=False):
+    """Transcribe many files with one shared model, yielding events tagged with the file's index in `paths`.
+
+    With processes=True the files are handled by forked worker processes that share the
+    weights loaded here (see shared_model); otherwise by threads in this process.
+    """
+    workers = max(1, workers)
+    if processes and not shared_model.available(device):
+        yield {"type": "status", "message": "Worker processes need fork() and device=cpu; using threads instead."}
+        processes = False
+
+    yield {"type": "status", "message": "Loading model..."}
+    # Split the cores between the model replicas so the workers don't oversubscribe the CPU
+    cpu_threads = max(1, (os.cpu_count() or 1) // workers) if device == "cpu" else 0
+    model = load_model(model_size, device, compute_type, num_workers=workers, cpu_threads=cpu_threads)
+    if processes:
+        jobs = [
+            (path, dict(lang=lang, offset_str=offset_str, index_path=index_path,
+                        out_path=os.path.join(out_dir, f"{index}.srt") if out_dir else None))
+            for index, path in enumerate(paths)
+        ]
+        yield from shared_model.run_workers(model, workers, jobs, transcribe_file)
+        return
+
+    events = queue.Queue()
+
+    def run(index, path):
+        out_path = os.path.join(out_dir, f"{index}.srt") if out_dir else None
+        try:
+            for item in transcribe_file(path, lang=lang, offset_str=offset_str, model=model, out_path=out_path,
+                                        index_path=index_path):
+                item["file"] = index
+                events.put(item)
+        except Exception as e:
+            events.put({"type": "error", "file": index, "message": str(e)})
+        finally:
+            events.put(None)
+
+    pool = ThreadPoolExecutor(max_workers=workers)
+    try:
+        for index, path in enumerate(paths):
+            pool.submit(run, index, path)
+        remaining = len(paths)
+        while remaining:
+            item = events.get()
+            if item is None:
+                remaining -= 1
+                continue
+            yield item
+    finally:
+        # Drop queued files if the consumer goes away early (e.g. the client disconnected)
+        pool.shutdown(wait=False, cancel_futures=True)
+
+def join_offset_arg(argv):
+    # argparse takes "--offset -00:00:02" for two options; keep a negative offset attached to its flag
+    out = []
+    args = iter(argv)
+    for arg in args:
+        if arg == "--offset":
+            value = next(args, None)
+            if value is None or value.startswith("--"):
+                out.extend(a for a in (arg, value) if a is not None)
+            else:
+                out.append(f"--offset={value}")
+        else:
+            out.append(arg)
+    return out
+
+def retime_main(argv):
+    ap = argparse.ArgumentParser(prog="fw_srt.py retime", description="Re-time and re-segment existing SRT files in bulk.")
+    ap.add_argument("input_path", nargs="+", help="SRT file(s) or directory to rewrite")
+    ap.add_argument("--offset", default="", help="Shift all cues, e.g. 00:30:00 or -00:00:02.5. (Default: None)")
+    ap.add_argument("--min-duration", type=float, default=0, help="Merge cues shorter than this many seconds. (Default: off)")
+    ap.add_argument("--max-gap", type=float, default=0.5, help="Only merge cues at most this many seconds apart. (Default: 0.5)")
+    ap.add_argument("--max-duration", type=float, default=0, help="Split cues longer than this many seconds. (Default: off)")
+    ap.add_argument("--max-chars", type=int, default=0, help="Split cues with more characters than this. (Default: off)")
+    ap.add_argument("--output-dir", default=None, help="Write results here instead of rewriting files in place.")
+    ap.add_argument("--jobs", type=int, default=os.cpu_count(), help="Number of worker processes. (Default: CPU count)")
+    args = ap.parse_args(join_offset_arg(argv))
+
+    sources, targets = [], []
+    for path in args.input_path:
+        if os.path.isdir(path):
+            for root, _, files in os.walk(path):
+                for file in files:
+                    if file.lower().endswith(".srt"):
+                        src = os.path.join(root, file)
+                        sources.append(src)
+                        targets.append(os.path.join(args.output_dir, os.path.relpath(src, path)) if args.output_dir else src)
+        else:
+            sources.append(path)
+            targets.append(os.path.join(args.output_dir, os.path.basename(path)) if args.output_dir else path)
+
+    print(f"Found {len(sources)} SRT file(s) to process.")
+    off = parse_offset(args.offset)
+    started = time.time()
+    total_cues = total_skipped = failed = 0
+    with ProcessPoolExecutor(max_workers=max(1, args.jobs)) as pool:
+        results = pool.map(retime_file, sources, targets, repeat(off), repeat(args.min_duration), repeat(args.max_gap),
+                           repeat(args.max_duration), repeat(args.max_chars), chunksize=64)
+        for i, (src, count, skipped, error) in enumerate(results, 1):
+            if error:
+                failed += 1
+                print(f"\n✗ {src}: {error}")
+            elif skipped:
+                print(f"\n! {src}: dropped {skipped} cue(s) that could not be parsed")
+            total_cues += count
+            total_skipped += skipped
+            print(f"Progress: {i}/{len(sources)}", end="\r")
+
+    print(f"\n✓ Rewrote {len(sources) - failed} file(s), {total_cues} cue(s) in {time.time() - started:.1f}s")
+    if total_skipped:
+        print(f"! {total_skipped} unparseable cue(s) found; in-place files containing them were left unchanged")
+
+def search_main(argv):
+    ap = argparse.ArgumentParser(prog="fw_srt.py search", description="Find where words were said in indexed transcripts.")
+    ap.add_argument("query", nargs="+", help='Words to find; wrap a phrase in quotes, e.g. \'"machine learning"\'')
+    ap.add_argument("--index-file", default=transcript_index.DEFAULT_INDEX, help="Search index file. (Default: ~/captionary_index.db)")
+    ap.add_argument("--limit", type=int, default=20, help="Maximum number of hits. (Default: 20)")
+    args = ap.parse_args(argv)
+
+    started = time.time()
+    results = transcript_index.search(args.index_file, " ".join(args.query), args.limit)
+    for hit in results:
+        print(f"{hit['path']}  {ts(hit['start'])}  {hit['text']}")
+    print(f"{len(results)} hit(s) in {(time.time() - started) * 1000:.0f} ms")
+
+def run_workers_cli(files_to_process, args, index_path=None):
+    memory = {}
+    generator = transcribe_batch(files_to_process, args.model, args.lang, args.offset, args.device, args.compute_type,
+                                 workers=args.workers, index_path=index_path, processes=True)
+    for item in generator:
+        name = files_to_process[item["file"]] if "file" in item else None
+        if item["type"] == "complete":
+            print(f"✓ SRT written: {item['path']}")
+        elif item["type"] == "error":
+            print(f"✗ {name}: {item['message']}")
+        elif item["type"] == "memory":
+            memory[item.get("worker", "host")] = item
+        elif item["type"] == "status" and name is None:
+            print(f"Status: {item['message']}")
+
+    if memory:
+        print("\nMemory per process (PSS splits shared pages between the processes using them):")
+        for key, mem in memory.items():
+            label = "host" if key == "host" else f"worker {key}"
+            figures = [f"{name} {mem[field]} MB" for name, field in
+                       (("RSS", "rss_mb"), ("PSS", "pss_mb"), ("peak RSS", "peak_rss_mb")) if mem.get(field) is not None]
+            print(f"  {label:<9} pid {mem['pid']}: {', '.join(figures)}")
+
+def build_arg_parser():
     ap = argparse.ArgumentParser(description="Captionary CLI - Auto-generate subtitles for audio/video files.")
     ap.add_argument("input_path", nargs="+", help="Audio file(s) or directory to transcribe")
     ap.add_argument("--model", default="large-v3-turbo", help="Model size: tiny, base, small, medium, large-v2, large-v3, large-v3-turbo. (Default: large-v3-turbo)")
@@ -111,23 +438,35 @@ def main():
     ap.add_argument("--offset", default="", help="Time offset for subtitles, e.g. 00:30:00. (Default: None)")
     ap.add_argument("--device", default="cpu", help="Compute device: cpu or cuda. (Default: cpu)")
     ap.add_argument("--compute_type", default="int8", help="Quantization: int8, int8_float16, float16, float32. (Default: int8)")
-    args = ap.parse_args()
+    ap.add_argument("--workers", type=int, default=1,
+                    help="Transcribe this many files at once in worker processes; only this process loads the model and "
+                         "the workers send it their model calls (CPU only). (Default: 1)")
+    ap.add_argument("--index", action="store_true",
+                    help="Also add word timestamps to the search index. See 'fw_srt.py search'.")
+    ap.add_argument("--index-file", default=None,
+                    help="Search index file to use; implies --index. (Default: ~/captionary_index.db)")
+    return ap
 
-    files_to_process = []
-    for path in args.input_path:
-        if os.path.isdir(path):
-            for root, _, files in os.walk(path):
-                for file in files:
-                    if file.lower().endswith(('.mp3', '.wav', '.m4a', '.mp4', '.mkv', '.mov', '.avi', '.flac', '.ogg', '.webm')):
-                        files_to_process.append(os.path.join(root, file))
-        else:
-            files_to_process.append(path)
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == "retime":
+        return retime_main(sys.argv[2:])
+    if len(sys.argv) > 1 and sys.argv[1] == "search":
+        return search_main(sys.argv[2:])
+
+    args = build_arg_parser().parse_args(join_offset_arg(sys.argv[1:]))
+    index_path = args.index_file or (transcript_index.DEFAULT_INDEX if args.index else None)
+
+    files_to_process = find_media_files(args.input_path)
 
     print(f"Found {len(files_to_process)} file(s) to process.")
 
+    if args.workers > 1:
+        return run_workers_cli(files_to_process, args, index_path)
+
     for i, audio_file in enumerate(files_to_process, 1):
         print(f"\n[{i}/{len(files_to_process)}] Processing: {audio_file}")
-        generator = transcribe_file(audio_file, args.model, args.lang, args.offset, args.device, args.compute_type)
+        generator = transcribe_file(audio_file, args.model, args.lang, args.offset, args.device, args.compute_type,
+                                   index_path=index_path)
         out = None
         for item in generator:
             if item["type"] == "complete":
@@ -0,0 +1,168 @@
+"""Multi-process transcription with a single copy of the model weights.
+
+A loaded CTranslate2 model cannot simply be inherited through fork(): its replica
+threads do not survive it, so a forked child that calls the model hangs. Instead the
+parent process keeps the only loaded model (one replica per worker; on CPU the replicas
+share one set of weights) and serves the encode/generate/align/detect_language calls
+that forked workers make over a pipe. Everything else faster-whisper does per file
+(audio decoding, VAD, feature extraction, tokenizing, word timing) runs in the workers,
+which inherit the tokenizer and feature extractor copy-on-write but hold no weights.
+"""
+import copy, multiprocessing, os, queue, sys, threading
+from types import SimpleNamespace
+
+import ctranslate2
+import numpy as np
+
+def available(device):
+    # CUDA contexts do not survive fork() either, and Windows has no fork() at all
+    return device == "cpu" and "fork" in multiprocessing.get_all_start_methods()
+
+def process_memory():
+    """Resident memory of this process in MB.
+
+    PSS divides shared pages between the processes mapping them, so summing it over the
+    host and the workers gives their real combined footprint; RSS counts shared pages in full.
+    Without /proc (macOS) only the peak RSS is known, reported as peak_rss_mb.
+    """
+    mem = {"pid": os.getpid(), "rss_mb": None, "pss_mb": None, "peak_rss_mb": None}
+    try:
+        with open("/proc/self/smaps_rollup") as f:
+            for line in f:
+                key, _, value = line.partition(":")
+                if key in ("Rss", "Pss"):
+                    mem[key.lower() + "_mb"] = round(int(value.split()[0]) / 1024, 1)
+    except OSError:
+        import resource  # ru_maxrss is in bytes on macOS, KB elsewhere
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        mem["peak_rss_mb"] = round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+    return mem
+
+class RemoteWhisper:
+    """Stands in for `WhisperModel.model` inside a worker and forwards calls to the host."""
+
+    def __init__(self, conn, attributes):
+        self._conn = conn
+        self.__dict__.update(attributes)
+
+    def _call(self, method, *args, **kwargs):
+        self._conn.send((method, args, kwargs))
+        ok, value = self._conn.recv()
+        if not ok:
+            raise RuntimeError(value)
+        return value
+
+    def encode(self, features, to_cpu=False):
+        return self._call("encode", np.asarray(features), to_cpu=to_cpu)
+
+    def generate(self, encoder_output, *args, **kwargs):
+        return self._call("generate", np.asarray(encoder_output), *args, **kwargs)
+
+    def align(self, encoder_output, *args, **kwargs):
+        return self._call("align", np.asarray(encoder_output), *args, **kwargs)
+
+    def detect_language(self, encoder_output, *args, **kwargs):
+        return self._call("detect_language", np.asarray(encoder_output), *args, **kwargs)
+
+def _plain(method, result):
+    # CTranslate2 result objects cannot be pickled; send their fields instead
+    if method == "encode":
+        return np.array(result)
+    if method == "generate":
+        return [SimpleNamespace(sequences=r.sequences, sequences_ids=r.sequences_ids,
+                                scores=r.scores, no_speech_prob=r.no_speech_prob) for r in result]
+    if method == "align":
+        return [SimpleNamespace(alignments=r.alignments, text_token_probs=r.text_token_probs) for r in result]
+    return result
+
+def _serve(model, conn):
+    # One thread per worker; concurrent calls run in parallel on the model's replicas
+    while True:
+        try:
+            method, args, kwargs = conn.recv()
+        except (EOFError, OSError):
+            return
+        try:
+            storage = ctranslate2.StorageView.from_array(np.ascontiguousarray(args[0]))
+            result = getattr(model, method)(storage, *args[1:], **kwargs)
+            reply = (True, _plain(method, result))
+        except Exception as e:
+            reply = (False, str(e))
+        try:
+            conn.send(reply)
+        except OSError:  # includes BrokenPipeError: the batch was abandoned mid-call
+            return
+
+def _worker(number, whisper_model, conn, target, jobs, events):
+    whisper_model.model = RemoteWhisper(conn, whisper_model.model)
+    while True:
+        job = jobs.get()
+        if job is None:
+            return
+        index, path, kwargs = job
+        try:
+            for item in target(path, model=whisper_model, **kwargs):
+                item["file"] = index
+                events.put(item)
+        except Exception as e:
+            events.put({"type": "error", "file": index, "message": str(e)})
+        events.put(dict(process_memory(), type="memory", role="worker", worker=number, file=index))
+        events.put(None)
+
+def run_workers(whisper_model, workers, jobs, target):
+    """Run target(path, model=..., **kwargs) for every (path, kwargs) in jobs across forked workers.
+
+    Yields the target's events tagged with the job's index as "file", plus "memory" events
+    for the host before any work starts and for the worker and the host after every file.
+    """
+    ctx = multiprocessing.get_context("fork")
+    job_queue, events = ctx.Queue(), ctx.Queue()
+    for index, (path, kwargs) in enumerate(jobs):
+        job_queue.put((index, path, kwargs))
+
+    # Read these on the host: the worker must never touch the real CTranslate2 object
+    real = whisper_model.model
+    attributes = {"is_multilingual": real.is_multilingual, "n_mels": real.n_mels,
+                  "num_languages": real.num_languages, "device": real.device, "device_index": real.device_index}
+    worker_model = copy.copy(whisper_model)
+    worker_model.model = attributes
+
+    processes, conns = [], []
+    for number in range(workers):
+        host_conn, worker_conn = ctx.Pipe()
+        process = ctx.Process(target=_worker, args=(number, worker_model, worker_conn, target, job_queue, events),
+                              daemon=True)
+        process.start()
+        worker_conn.close()
+        processes.append(process)
+        conns.append(host_conn)
+        job_queue.put(None)
+
+    for conn in conns:
+        threading.Thread(target=_serve, args=(real, conn), daemon=True).start()
+
+    try:
+        yield dict(process_memory(), type="memory", role="host")
+        remaining = len(jobs)
+        while remaining:
+            try:
+                item = events.get(timeout=1)
+            except queue.Empty:
+                if any(p.exitcode not in (None, 0) for p in processes):
+                    raise RuntimeError("A transcription worker process died unexpectedly.")
+                continue
+            if item is None:
+                remaining -= 1
+                continue
+            yield item
+            if item["type"] == "memory":
+                # Sample the host next to each worker so the figures reflect the same moment
+                yield dict(process_memory(), type="memory", role="host", file=item["file"])
+        for process in processes:
+            process.join()
+    finally:
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+        for conn in conns:
+            conn.close()
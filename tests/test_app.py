@@ -17,3 +17,87 @@ def test_static_files():
 def test_download_endpoint_no_file():
     response = client.get("/download/nonexistent.srt")
     assert response.json() == {"error": "File not found"}
+
+def test_batch_no_files():
+    response = client.post("/transcribe/batch", data={"directory": "/nonexistent/dir"})
+    assert response.json() == {"type": "error", "message": "No files provided."}
+
+def test_batch_streams_events_and_zip(tmp_path, monkeypatch):
+    import json
+    import zipfile
+    import fw_srt
+
+    for name in ("a.mp3", "b.mp3"):
+        (tmp_path / name).write_bytes(b"")
+
+    def fake_transcribe_file(audio_path, model_size="medium", lang=None, offset_str="", device="cpu",
+                             compute_type="int8", model=None, out_path=None, index_path=None):
+        with open(out_path, "w", encoding="utf-8") as f:
+            f.write(f"1\n00:00:00,000 --> 00:00:01,000\n{os.path.basename(audio_path)}\n\n")
+        yield {"type": "progress", "value": 1.0}
+        yield {"type": "complete", "path": out_path}
+
+    monkeypatch.setattr(fw_srt, "load_model", lambda *args, **kwargs: None)
+    monkeypatch.setattr(fw_srt, "transcribe_file", fake_transcribe_file)
+
+    response = client.post("/transcribe/batch", data={"directory": str(tmp_path), "pattern": "*.mp3", "workers": "2"})
+    events = [json.loads(line) for line in response.text.splitlines()]
+    assert events[0]["type"] == "batch"
+    assert sorted(e["name"] for e in events if e["type"] == "file_complete") == ["a.srt", "b.srt"]
+    assert events[-1]["type"] == "complete"
+
+    archive = client.get(events[-1]["url"])
+    assert archive.headers["content-type"] == "application/zip"
+    with zipfile.ZipFile(io.BytesIO(archive.content)) as zf:
+        assert sorted(zf.namelist()) == ["a.srt", "b.srt"]
+        assert "a.mp3" in zf.read("a.srt").decode()
+
+def test_search_endpoint(tmp_path, monkeypatch):
+    import app as app_module
+    import transcript_index
+
+    index_path = str(tmp_path / "index.db")
+    transcript_index.add_file(index_path, "/media/talk.mkv", [
+        (61.0, 63.0, "Welcome to the show", [("Welcome", 61.0, 61.4), ("to", 61.4, 61.5), ("the", 61.5, 61.7), ("show", 61.7, 62.0)]),
+    ])
+    monkeypatch.setattr(app_module, "INDEX_PATH", index_path)
+
+    response = client.get("/search", params={"q": "show"})
+    hit = response.json()["results"][0]
+    assert hit["path"] == "/media/talk.mkv"
+    assert hit["timestamp"] == "00:01:01,700"
+
+def test_batch_archive_names_are_unique():
+    from app import batch_archive_names
+    names = batch_archive_names(["a_2.mp3", "x/a.mp3", "y/a.mp3"], None)
+    assert len(set(names)) == 3
+    assert names[0] == "a_2.srt" and names[1] == "a.srt"
+
+def test_batch_rejects_worker_count():
+    response = client.post("/transcribe/batch", data={"file_paths": ["a.mp3"], "workers": "0"})
+    assert response.status_code == 422
+
+def test_batch_error_removes_partial_zip(tmp_path, monkeypatch):
+    import json
+    import tempfile
+    import fw_srt
+
+    (tmp_path / "media").mkdir()
+    (tmp_path / "media" / "a.mp3").write_bytes(b"")
+    work_dir = tmp_path / "work"
+    work_dir.mkdir()
+
+    def failing_batch(paths, **kwargs):
+        yield {"type": "status", "message": "Loading model..."}
+        raise RuntimeError("model exploded")
+
+    monkeypatch.setattr(tempfile, "gettempdir", lambda: str(work_dir))
+    monkeypatch.setattr(fw_srt, "transcribe_batch", failing_batch)
+
+    response = client.post("/transcribe/batch", data={"directory": str(tmp_path / "media")})
+    events = [json.loads(line) for line in response.text.splitlines()]
+    assert events[-1] == {"type": "error", "message": "model exploded"}
+    assert list(work_dir.iterdir()) == []
+
+def test_search_rejects_bad_limit():
+    assert client.get("/search", params={"q": "show", "limit": -1}).status_code == 422
@@ -0,0 +1,46 @@
+import transcript_index
+
+CUES = [
+    (0.0, 2.0, "Hello and welcome", [("Hello", 0.0, 0.4), ("and", 0.5, 0.7), ("welcome", 0.8, 1.5)]),
+    (5.0, 8.0, "Today we talk about machine learning.",
+     [("Today", 5.0, 5.3), ("we", 5.4, 5.5), ("talk", 5.6, 5.9), ("about", 6.0, 6.3),
+      ("machine", 6.4, 6.9), ("learning.", 7.0, 7.6)]),
+]
+
+def test_search_word_timestamps(tmp_path):
+    index_path = str(tmp_path / "index.db")
+    transcript_index.add_file(index_path, "/media/a.mp4", CUES)
+
+    hits = transcript_index.search(index_path, "learning machine")
+    assert len(hits) == 1
+    assert (hits[0]["path"], hits[0]["start"], hits[0]["end"]) == ("/media/a.mp4", 7.0, 7.6)
+
+    assert transcript_index.search(index_path, '"machine learning"')[0]["start"] == 6.4
+    assert transcript_index.search(index_path, '"learning machine"') == []
+
+def test_reindex_replaces_file(tmp_path):
+    index_path = str(tmp_path / "index.db")
+    transcript_index.add_file(index_path, "/media/a.mp4", CUES)
+    transcript_index.add_file(index_path, "/media/b.mp4", CUES[:1])
+    transcript_index.add_file(index_path, "/media/a.mp4", CUES[1:])
+
+    assert [h["path"] for h in transcript_index.search(index_path, "welcome")] == ["/media/b.mp4"]
+    assert transcript_index.search(str(tmp_path / "missing.db"), "welcome") == []
+
+def test_hit_times_follow_fts_tokenizer(tmp_path):
+    index_path = str(tmp_path / "index.db")
+    transcript_index.add_file(index_path, "/media/c.mp4", [
+        (0.0, 4.0, "Well, I don't like the café.",
+         [("Well,", 0.0, 0.3), ("I", 0.4, 0.5), ("don't", 0.6, 0.9), ("like", 1.0, 1.2),
+          ("the", 1.3, 1.4), ("café.", 1.5, 2.0)]),
+        (5.0, 9.0, "like this, not like that",
+         [("like", 5.0, 5.2), ("this,", 5.3, 5.6), ("not", 5.7, 5.9), ("like", 6.0, 6.2), ("that", 6.3, 6.6)]),
+    ])
+
+    hit = transcript_index.search(index_path, "don't")[0]
+    assert (hit["start"], hit["end"]) == (0.6, 0.9)
+    hit = transcript_index.search(index_path, "cafe")[0]
+    assert (hit["start"], hit["end"]) == (1.5, 2.0)
+    # A phrase points at where the whole phrase is said, not the first "like"
+    hit = transcript_index.search(index_path, '"like that"')[0]
+    assert (hit["start"], hit["end"]) == (6.0, 6.6)
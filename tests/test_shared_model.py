@@ -0,0 +1,59 @@
+import os
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+import shared_model
+
+class FakeWhisper:
+    is_multilingual = True
+    n_mels = 80
+    num_languages = 99
+    device = "cpu"
+    device_index = [0]
+
+    def encode(self, features, to_cpu=False):
+        return np.asarray(features) * 2
+
+def fake_target(path, model=None, scale=1):
+    out = model.model.encode(np.full((1, 2), scale, dtype=np.float32))
+    yield {"type": "complete", "path": path, "value": out.tolist(), "pid": os.getpid()}
+
+@pytest.mark.skipif(not shared_model.available("cpu"), reason="needs fork()")
+def test_run_workers_forwards_model_calls_to_host():
+    whisper_model = SimpleNamespace(model=FakeWhisper())
+    jobs = [("a.wav", {"scale": 1}), ("b.wav", {"scale": 3}), ("c.wav", {"scale": 5})]
+    events = list(shared_model.run_workers(whisper_model, 2, jobs, fake_target))
+
+    results = {e["file"]: e for e in events if e["type"] == "complete"}
+    assert {i: r["value"] for i, r in results.items()} == {0: [[2.0, 2.0]], 1: [[6.0, 6.0]], 2: [[10.0, 10.0]]}
+    assert all(r["pid"] != os.getpid() for r in results.values())
+
+    memory = [e for e in events if e["type"] == "memory"]
+    assert memory[0]["role"] == "host"
+    assert sorted(e["file"] for e in memory if e["role"] == "worker") == [0, 1, 2]
+    assert sorted(e["file"] for e in memory[1:] if e["role"] == "host") == [0, 1, 2]
+    # The real model object stays in the host process
+    assert isinstance(whisper_model.model, FakeWhisper)
+
+def test_serve_survives_closed_connection():
+    import multiprocessing
+    import threading
+
+    host_conn, worker_conn = multiprocessing.Pipe()
+    worker_conn.send(("encode", (np.ones((1, 2), dtype=np.float32),), {}))
+    worker_conn.close()
+    errors = []
+    thread = threading.Thread(target=lambda: errors.append(shared_model._serve(FakeWhisper(), host_conn)))
+    thread.start()
+    thread.join(timeout=5)
+    assert not thread.is_alive() and errors == [None]
+
+def test_process_memory_reports_available_figures():
+    mem = shared_model.process_memory()
+    assert mem["pid"] == os.getpid()
+    if os.path.exists("/proc/self/smaps_rollup"):
+        assert mem["rss_mb"] > 0 and mem["pss_mb"] > 0 and mem["peak_rss_mb"] is None
+    else:
+        assert mem["rss_mb"] is None and mem["pss_mb"] is None and mem["peak_rss_mb"] > 0
@@ -0,0 +1,100 @@
+import io
+import fw_srt
+
+SAMPLE = """1
+00:00:01,000 --> 00:00:02,500
+Hello there
+
+2
+00:00:02,600 --> 00:00:02,900
+ok
+
+3
+00:00:10,000 --> 00:00:20,000
+this is a rather long cue that should be split in two
+"""
+
+def test_ts_round_trip():
+    assert fw_srt.ts(1.9996) == "00:00:02,000"
+    assert fw_srt.parse_ts(fw_srt.ts(3723.456)) == 3723.456
+    assert fw_srt.parse_offset("-00:01:30") == -90.0
+
+def test_read_write_srt():
+    cues = list(fw_srt.read_srt(io.StringIO(SAMPLE)))
+    assert cues[0] == (1.0, 2.5, "Hello there")
+    out = io.StringIO()
+    assert fw_srt.write_srt(out, cues) == 3
+    assert out.getvalue() == SAMPLE + "\n"
+
+def test_retime_file(tmp_path):
+    src = tmp_path / "in.srt"
+    src.write_text(SAMPLE, encoding="utf-8")
+    dst = tmp_path / "out" / "in.srt"
+    _, count, skipped, error = fw_srt.retime_file(str(src), str(dst), off=-1.5, min_duration=0.5, max_duration=6)
+    assert error is None and skipped == 0
+    cues = list(fw_srt.read_srt(open(dst, encoding="utf-8")))
+    assert count == len(cues) == 3
+    # The first cue was clamped at zero and merged with the short "ok" cue
+    assert cues[0] == (0.0, 1.4, "Hello there ok")
+    # The 10s cue was split in two, keeping its overall span
+    assert cues[1][0] == 8.5 and cues[2][1] == 18.5 and cues[1][1] == cues[2][0]
+
+def test_parse_ts_pads_fraction():
+    assert fw_srt.parse_ts("00:00:01.5") == 1.5
+    assert fw_srt.parse_ts("00:00:01,50") == 1.5
+    assert fw_srt.parse_ts("01:02,500") == 62.5
+
+def test_merge_short_run_stops_at_min_duration():
+    cues = [(i * 1.0, i * 1.0 + 0.9, f"c{i}") for i in range(20)]
+    merged = list(fw_srt.merge_short_cues(cues, 1, 0.5))
+    assert len(merged) == 10
+    assert all(round(end - start, 3) == 1.9 for start, end, _ in merged)
+
+    # Short cues after a long one are not swallowed by it
+    cues = [(0.0, 10.0, "long"), (10.1, 10.3, "a"), (10.4, 10.6, "b")]
+    assert list(fw_srt.merge_short_cues(cues, 1, 0.5)) == [(0.0, 10.0, "long"), (10.1, 10.6, "a b")]
+
+def test_merge_keeps_overlap_end_and_max_duration():
+    # The later of two overlapping cues may end first; the merged cue still covers both
+    assert list(fw_srt.merge_short_cues([(0, 0.5, "a"), (0.2, 0.4, "b")], 1, 0.5)) == [(0, 0.5, "a b")]
+    # A short cue is not merged forward into one that would exceed max_duration
+    cues = [(0.0, 0.2, "a"), (0.5, 6.3, "fine as it is")]
+    assert list(fw_srt.merge_short_cues(cues, 1, 0.5, max_duration=6)) == cues
+
+def test_retime_reports_malformed_cue(tmp_path):
+    src = tmp_path / "in.srt"
+    original = "1\n00:00:xx,000 --> 00:00:02,000\nbroken\n\n" + SAMPLE
+    src.write_text(original, encoding="utf-8")
+
+    # Rewriting in place would lose the cue, so the file is left alone
+    _, count, skipped, error = fw_srt.retime_file(str(src), str(src))
+    assert skipped == 1 and error is not None
+    assert src.read_text(encoding="utf-8") == original
+    assert list(tmp_path.iterdir()) == [src]
+
+    # A copy elsewhere is written without it, and the skip is reported
+    _, count, skipped, error = fw_srt.retime_file(str(src), str(tmp_path / "out" / "in.srt"))
+    assert error is None and (count, skipped) == (3, 1)
+
+    src.write_bytes(b"1\n00:00:01,000 --> 00:00:02,000\n\xff\xfe\n\n")
+    _, _, _, error = fw_srt.retime_file(str(src), str(tmp_path / "bad.srt"))
+    assert error is not None
+    assert not (tmp_path / "bad.srt.tmp").exists()
+
+def test_negative_offset_argument():
+    assert fw_srt.join_offset_arg(["a.srt", "--offset", "-00:00:02.5"]) == ["a.srt", "--offset=-00:00:02.5"]
+
+def test_transcribe_file_clamps_negative_offset(tmp_path):
+    from types import SimpleNamespace
+
+    segments = [SimpleNamespace(start=0.5, end=1.0, text="gone", words=None),
+                SimpleNamespace(start=1.0, end=3.0, text="kept", words=None)]
+    model = SimpleNamespace(transcribe=lambda *a, **kw: (iter(segments), SimpleNamespace(duration=3.0)))
+    out = tmp_path / "a.srt"
+    list(fw_srt.transcribe_file("a.wav", offset_str="-00:00:01.5", model=model, out_path=str(out)))
+    assert list(fw_srt.read_srt(open(out, encoding="utf-8"))) == [(0.0, 1.5, "kept")]
+
+def test_index_flag_does_not_take_input_path():
+    args = fw_srt.build_arg_parser().parse_args(["--index", "a.mp3", "b.mp3"])
+    assert args.input_path == ["a.mp3", "b.mp3"]
+    assert args.index is True and args.index_file is None
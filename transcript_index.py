@@ -0,0 +1,114 @@
+"""Full-text search over generated transcripts, with word-level timestamps, stored in SQLite FTS5."""
+import json, os, re, sqlite3, unicodedata
+
+DEFAULT_INDEX = os.path.join(os.path.expanduser("~"), "captionary_index.db")
+
+# Cue rows live in a plain table (indexed by file) and the FTS table only references them,
+# so re-indexing a file never scans the whole index and the text is stored once.
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY,
+    path TEXT UNIQUE NOT NULL
+);
+CREATE TABLE IF NOT EXISTS cues (
+    id INTEGER PRIMARY KEY,
+    file_id INTEGER NOT NULL,
+    start_time REAL NOT NULL,
+    end_time REAL NOT NULL,
+    text TEXT NOT NULL,
+    words TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS cues_file_id ON cues(file_id);
+CREATE VIRTUAL TABLE IF NOT EXISTS cues_fts USING fts5(
+    text, content='cues', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+);
+"""
+
+def connect(index_path):
+    conn = sqlite3.connect(index_path, timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")  # readers don't block the workers that are adding files
+    conn.executescript(SCHEMA)
+    return conn
+
+def tokenize(text):
+    # Mirror the FTS tokenizer (unicode61 remove_diacritics 2): runs of letters/digits,
+    # lowercased and without diacritics; everything else, including "'" and "_", separates.
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return re.findall(r"[^\W_]+", text)
+
+def add_file(index_path, path, cues):
+    """Replace the indexed transcript of `path` with `cues`: (start, end, text, [(word, start, end), ...])."""
+    conn = connect(index_path)
+    try:
+        with conn:
+            row = conn.execute("SELECT id FROM files WHERE path = ?", (path,)).fetchone()
+            if row:
+                file_id = row[0]
+                conn.execute(
+                    "INSERT INTO cues_fts(cues_fts, rowid, text) SELECT 'delete', id, text FROM cues WHERE file_id = ?",
+                    (file_id,)
+                )
+                conn.execute("DELETE FROM cues WHERE file_id = ?", (file_id,))
+            else:
+                file_id = conn.execute("INSERT INTO files(path) VALUES (?)", (path,)).lastrowid
+
+            conn.executemany(
+                "INSERT INTO cues(file_id, start_time, end_time, text, words) VALUES (?, ?, ?, ?, ?)",
+                (
+                    (file_id, start, end, text,
+                     json.dumps([[w, round(ws, 3), round(we, 3)] for w, ws, we in words], separators=(",", ":")))
+                    for start, end, text, words in cues
+                )
+            )
+            conn.execute("INSERT INTO cues_fts(rowid, text) SELECT id, text FROM cues WHERE file_id = ?", (file_id,))
+    finally:
+        conn.close()
+
+def parse_query(query):
+    """Turn free text into an FTS5 query: "quoted text" is a phrase, every other word must appear.
+
+    Returns (match expression, list of phrases as token lists in query order).
+    """
+    parts, phrases = [], []
+    for phrase, word in re.findall(r'"([^"]*)"|(\S+)', query):
+        tokens = tokenize(phrase or word)
+        if tokens:
+            parts.append('"' + " ".join(tokens) + '"')
+            phrases.append(tokens)
+    return " ".join(parts), phrases
+
+def _locate(words, tokens):
+    """Return (start, end) of the first place the token sequence is spoken, or None."""
+    spoken = [(token, start, end) for word, start, end in words for token in tokenize(word)]
+    n = len(tokens)
+    for i in range(len(spoken) - n + 1):
+        if all(spoken[i + k][0] == tokens[k] for k in range(n)):
+            return spoken[i][1], spoken[i + n - 1][2]
+    return None
+
+def search(index_path, query, limit=20):
+    """Return the best matching cues as dicts with the file path and the time the first query word or phrase is spoken."""
+    match, phrases = parse_query(query)
+    if not match or not os.path.exists(index_path):
+        return []
+
+    conn = connect(index_path)
+    try:
+        rows = conn.execute(
+            """SELECT f.path, c.start_time, c.end_time, c.text, c.words
+               FROM cues_fts JOIN cues c ON c.id = cues_fts.rowid JOIN files f ON f.id = c.file_id
+               WHERE cues_fts MATCH ? ORDER BY rank LIMIT ?""",
+            (match, limit)
+        ).fetchall()
+    finally:
+        conn.close()
+
+    results = []
+    for path, start, end, text, words in rows:
+        hit_start, hit_end = _locate(json.loads(words), phrases[0]) or (start, end)
+        results.append({
+            "path": path, "start": hit_start, "end": hit_end,
+            "cue_start": start, "cue_end": end, "text": text
+        })
+    return results